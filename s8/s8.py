@@ -2,6 +2,8 @@ import time
 import os
 import logging
 import json
+import random
+import bisect
 from serial import Serial, SerialException
 from prometheus_client import start_http_server, Gauge, Counter
 import paho.mqtt.client as mqtt
@@ -21,14 +23,53 @@ MQTT_TOPIC_PREFIX = os.getenv('MQTT_TOPIC_PREFIX', 'sensors/co2')
 SERIAL_PORT = os.getenv('SERIAL_PORT', '/dev/ttyAMA0')
 PROMETHEUS_PORT = int(os.getenv('PROMETHEUS_PORT', '9100'))
 
-# CO2 Level Classifications
-CO2_LEVELS = {
-    'GREAT': (350, 450, 'Same as outdoor level'),
-    'NORMAL': (451, 1000, 'Normal indoor level'),
-    'SLEEPY': (1001, 2000, 'May cause drowsiness'),
-    'WARNING': (2001, 5000, 'Warning level - Poor air quality'),
-    'ALERT': (5001, float('inf'), 'ALERT - Dangerous level')
-}
+# MQTT topics and constant payloads, built once at startup
+STATE_TOPIC = f"{MQTT_TOPIC_PREFIX}/state"
+PEAK_TOPIC = f"{MQTT_TOPIC_PREFIX}/peak"
+ONLINE_TOPIC = f"{MQTT_TOPIC_PREFIX}/online"
+ONLINE_1 = b"1"
+ONLINE_0 = b"0"
+
+# Only publish the state when it changes, plus a heartbeat every STATE_HEARTBEAT_CYCLES readings
+STATE_PPM_DELTA = 10  # ppm change that counts as a new reading
+STATE_HEARTBEAT_CYCLES = 30
+
+# CO2 Level Classifications as (upper bound ppm, level, description), sorted by bound
+CO2_LEVEL_TABLE = (
+    (450, 'GREAT', 'Same as outdoor level'),
+    (1000, 'NORMAL', 'Normal indoor level'),
+    (2000, 'SLEEPY', 'May cause drowsiness'),
+    (5000, 'WARNING', 'Warning level - Poor air quality'),
+    (10**9, 'ALERT', 'ALERT - Dangerous level')
+)
+
+def _level_ranges(table, lowest=350):
+    """Expand CO2_LEVEL_TABLE into level -> (min, max, description); max is None for the open-ended last level"""
+    ranges = {}
+    lower = lowest
+    for i, (upper, level, description) in enumerate(table):
+        ranges[level] = (lower, upper if i < len(table) - 1 else None, description)
+        lower = upper + 1
+    return ranges
+
+# Same classifications as ranges, for startup logging
+CO2_LEVELS = _level_ranges(CO2_LEVEL_TABLE)
+
+# Adaptive polling: poll faster while CO2 is changing or elevated, slower when stable
+POLL_INTERVAL_INITIAL = 10  # seconds
+POLL_INTERVAL_MIN = 2
+POLL_INTERVAL_MAX = 30
+POLL_INTERVAL_GROWTH = 1.3
+POLL_DELTA_THRESHOLD = 50  # ppm change between readings considered significant
+
+# Exponential backoff after failed readings or main loop errors
+ERROR_BACKOFF_INITIAL = 10  # seconds
+ERROR_BACKOFF_MAX = 300
+ERROR_BACKOFF_JITTER = 0.2  # +/- fraction of the backoff
+
+# Exponential backoff between MQTT connection attempts
+MQTT_RETRY_DELAY_BASE = 1.5  # seconds
+MQTT_RETRY_DELAY_MAX = 60
 
 # Log environment variables
 logger.info("Starting with configuration:")
@@ -43,24 +84,39 @@ co2_gauge = Gauge('co2_concentration_ppm', 'CO2 concentration in parts per milli
 co2_level = Gauge('co2_level', 'CO2 level classification', ['level'])
 co2_alerts = Counter('co2_alerts_total', 'Number of CO2 alerts by severity', ['severity'])
 
-# Initialize CO2 level gauges
-for level in CO2_LEVELS:
-    co2_level.labels(level=level).set(0)
+# Initialize CO2 level gauges, keeping the labelled children for the main loop
+LEVEL_GAUGES = {level: co2_level.labels(level=level) for level in CO2_LEVELS}
+for gauge in LEVEL_GAUGES.values():
+    gauge.set(0)
+
+# Upper bounds of each level except the last, for bisect lookups in get_co2_level
+_THRESHOLDS = [upper for (upper, _, _) in CO2_LEVEL_TABLE[:-1]]
+_LEVELS = [level for (_, level, _) in CO2_LEVEL_TABLE]
+_DESCS = [description for (_, _, description) in CO2_LEVEL_TABLE]
 
 def get_co2_level(ppm):
-    for level, (min_val, max_val, description) in CO2_LEVELS.items():
-        if min_val <= ppm <= max_val:
-            return level, description
-    return 'ALERT', CO2_LEVELS['ALERT'][2]
+    # Readings below the GREAT range are still reported as GREAT
+    i = bisect.bisect_left(_THRESHOLDS, ppm)
+    return _LEVELS[i], _DESCS[i]
+
+# MQTT connection state, maintained by on_connect/on_disconnect
+mqtt_connected = False
 
 # MQTT callbacks
+# Publishes are not waited on; delivery (PUBACK) is reported by on_publish, keyed by message id
 def on_connect(client, userdata, flags, reason_code, properties):
+    global mqtt_connected, online_status
     if reason_code == 0:
         logger.info("Successfully connected to MQTT broker")
+        mqtt_connected = True
+        # The broker may have fired our LWT while we were away, so resend online status
+        online_status = None
     else:
         logger.error(f"Failed to connect to MQTT broker. Reason code: {reason_code}")
 
 def on_disconnect(client, userdata, disconnect_flags, reason_code, properties=None):
+    global mqtt_connected
+    mqtt_connected = False
     logger.warning(f"Disconnected from MQTT broker with result code: {reason_code}")
     if reason_code != 0:
         logger.error("Unexpected disconnection. Attempting to reconnect...")
@@ -71,9 +127,36 @@ def on_publish(client, userdata, mid, reason_code=0, properties=None):
     else:
         logger.error(f"Failed to publish message {mid}. Reason code: {reason_code}")
 
-def read_co2():
+def _make_crc16_table():
+    """Build the lookup table for CRC-16/MODBUS (reflected polynomial 0xA001)"""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+CRC16_TABLE = _make_crc16_table()
+
+def _crc16(buf):
+    crc = 0xFFFF
+    for b in buf:
+        crc = (crc >> 8) ^ CRC16_TABLE[(crc ^ b) & 0xFF]
+    return crc
+
+def _valid_response(response):
+    """Check the slave address, function code and CRC trailer of a 7 byte Modbus response"""
+    return (
+        response[0] == 0xFE
+        and response[1] == 0x04
+        and _crc16(response[:5]) == int.from_bytes(response[5:7], 'little')
+    )
+
+def open_sensor():
+    """Open the serial port to the sensor, returning None on failure"""
     try:
-        logger.debug(f"Attempting to connect to serial port: {SERIAL_PORT}")
+        logger.debug("Attempting to connect to serial port: %s", SERIAL_PORT)
         sensor = Serial(
             port=SERIAL_PORT,
             baudrate=9600,
@@ -82,42 +165,63 @@ def read_co2():
             stopbits=1,
             timeout=0.5
         )
-        
         logger.info(f"Connected to sensor on port: {SERIAL_PORT}")
-        
-        # Clear input buffer and add a small delay
-        sensor.flushInput()
-        time.sleep(0.1)
+
+        # Ask the driver to hand over received bytes immediately (ASYNC_LOW_LATENCY).
+        # Not every UART driver supports this, so it is best effort
+        try:
+            sensor.set_low_latency_mode(True)
+            logger.debug("Enabled low latency mode on %s", SERIAL_PORT)
+        except (AttributeError, NotImplementedError, ValueError, OSError) as e:
+            logger.debug("Low latency mode not available on %s: %s", SERIAL_PORT, e)
+        return sensor
+
+    except SerialException as e:
+        logger.error(f"Serial communication error: {e}")
+        logger.error("\nPlease check:")
+        logger.error("1. Are you running with proper permissions?")
+        logger.error("2. Is the device plugged in?")
+        logger.error("3. Do you have the correct port name?")
+        return None
+
+def read_co2(sensor):
+    # Skip building hex dumps of the exchange unless debug logging is on
+    debug = logger.isEnabledFor(logging.DEBUG)
+    try:
+        # Drop any stale bytes left over from a previous exchange
+        sensor.reset_input_buffer()
         
         # Command to read CO2 value
         command = b"\xFE\x04\x00\x03\x00\x01\xd5\xc5"
-        logger.debug(f"Sending command: {command.hex()}")
+        if debug:
+            logger.debug("Sending command: %s", command.hex())
         
-        # Write the command and add a small delay
+        # Write the command; the read timeout bounds the wait for the response
         bytes_written = sensor.write(command)
-        logger.debug(f"Wrote {bytes_written} bytes")
+        logger.debug("Wrote %d bytes", bytes_written)
         sensor.flush()
-        time.sleep(0.1)
         
         # Read response
         logger.debug("Waiting for response...")
         response = sensor.read(7)
-        logger.debug(f"Received {len(response)} bytes: {response.hex() if response else 'no data'}")
+        if debug:
+            logger.debug("Received %d bytes: %s", len(response), response.hex() if response else 'no data')
         
         if len(response) == 7:
-            co2_high = response[3]
-            co2_low = response[4]
-            co2_ppm = (co2_high * 256) + co2_low
+            if not _valid_response(response):
+                logger.error(f"Invalid response from sensor (bad address, function code or CRC): {response.hex()}")
+                return None, None, None
+            co2_ppm = int.from_bytes(response[3:5], 'big')
             level, description = get_co2_level(co2_ppm)
             logger.info(f"CO2 reading: {co2_ppm} ppm - {level}: {description}")
-            return co2_ppm
+            return co2_ppm, level, description
         else:
             logger.error("Invalid response length")
             logger.error("\nTroubleshooting suggestions:")
             logger.error("1. Verify the correct port")
             logger.error("2. Check physical connections")
             logger.error("3. Verify sensor settings")
-            return None
+            return None, None, None
             
     except SerialException as e:
         logger.error(f"Serial communication error: {e}")
@@ -125,29 +229,40 @@ def read_co2():
         logger.error("1. Are you running with proper permissions?")
         logger.error("2. Is the device plugged in?")
         logger.error("3. Do you have the correct port name?")
-        return None
-        
-    finally:
-        if 'sensor' in locals() and sensor.is_open:
-            sensor.close()
-            logger.debug("Serial port closed")
+        # Close the port so the main loop reopens it on the next cycle
+        sensor.close()
+        logger.debug("Serial port closed")
+        return None, None, None
+
+def next_poll_interval(current_interval, co2_value, last_ppm, level):
+    """Halve the interval on a significant change or elevated level, otherwise back off"""
+    delta = abs(co2_value - last_ppm) if last_ppm is not None else 0
+    if delta > POLL_DELTA_THRESHOLD or level in ['WARNING', 'ALERT']:
+        return max(POLL_INTERVAL_MIN, current_interval / 2)
+    return min(POLL_INTERVAL_MAX, current_interval * POLL_INTERVAL_GROWTH)
+
+def jittered(delay):
+    """Spread retries by a random +/- ERROR_BACKOFF_JITTER fraction of the delay"""
+    return delay + random.uniform(-ERROR_BACKOFF_JITTER, ERROR_BACKOFF_JITTER) * delay
 
 def connect_mqtt(client):
-    """Attempt to connect to MQTT broker with retries"""
-    max_retries = 3
+    """Attempt to connect to MQTT broker with exponential backoff between retries"""
+    max_retries = 20
     retry_count = 0
-    retry_delay = 5  # seconds
 
     while retry_count < max_retries:
         try:
             logger.info(f"Attempting to connect to MQTT broker at {MQTT_HOST}:{MQTT_PORT} (attempt {retry_count + 1}/{max_retries})")
             client.connect(MQTT_HOST, MQTT_PORT, 60)
+            # Network I/O runs on paho's background thread, so PUBACKs for one reading
+            # are handled while the main loop sleeps and talks to the sensor
             client.loop_start()
             return True
         except Exception as e:
             retry_count += 1
             if retry_count < max_retries:
-                logger.warning(f"Failed to connect to MQTT broker: {e}. Retrying in {retry_delay} seconds...")
+                retry_delay = min(MQTT_RETRY_DELAY_MAX, MQTT_RETRY_DELAY_BASE * (1.3 ** retry_count)) + random.uniform(0, 0.5)
+                logger.warning(f"Failed to connect to MQTT broker: {e}. Retrying in {retry_delay:.1f} seconds...")
                 time.sleep(retry_delay)
             else:
                 logger.error(f"Failed to connect to MQTT broker after {max_retries} attempts: {e}")
@@ -156,8 +271,11 @@ def connect_mqtt(client):
 # Global variable to track peak PPM
 peak_ppm = 0
 
+# Last online status published to MQTT; None forces the next reading to republish it
+online_status = None
+
 def main():
-    global peak_ppm
+    global peak_ppm, online_status
     # Start prometheus HTTP server
     try:
         start_http_server(PROMETHEUS_PORT)
@@ -173,134 +291,187 @@ def main():
     client.on_publish = on_publish
     
     # Set Last Will and Testament for online status
-    online_topic = f"{MQTT_TOPIC_PREFIX}/online"
-    client.will_set(online_topic, "0", qos=1, retain=True)
+    client.will_set(ONLINE_TOPIC, ONLINE_0, qos=1, retain=True)
     
     if not connect_mqtt(client):
         logger.error("Failed to establish MQTT connection. Exiting.")
         return
 
-    logger.info("Starting main loop")
-    while True:
-        try:
-            co2_value = read_co2()
+    # The serial port is kept open across readings and only reopened after a failure
+    sensor = None
+    last_ppm = None
+    prev_level = None
+    current_interval = POLL_INTERVAL_INITIAL
+    error_backoff = ERROR_BACKOFF_INITIAL
+    last_published = {"detected": None, "level": None, "level_class": None}
+    peak_published = 0  # Last peak sent to PEAK_TOPIC; a peak reached while disconnected is sent later
+    heartbeat = 0
+
+    try:
+        logger.info("Starting main loop")
+        # Readings are scheduled against a monotonic deadline so processing time doesn't add drift
+        next_tick = time.monotonic()
+        while True:
+            try:
+                if sensor is None or not sensor.is_open:
+                    sensor = open_sensor()
+                if sensor is not None:
+                    co2_value, level, description = read_co2(sensor)
+                else:
+                    co2_value = None
             
-            if co2_value is not None:
-                # Get CO2 level classification
-                level, description = get_co2_level(co2_value)
-                
-                # Update Prometheus metrics
-                co2_gauge.set(co2_value)
-                
-                # Reset all level gauges
-                for l in CO2_LEVELS:
-                    co2_level.labels(level=l).set(0)
-                # Set current level to 1
-                co2_level.labels(level=level).set(1)
+                if co2_value is not None:
+                    # A good reading ends any error backoff
+                    error_backoff = ERROR_BACKOFF_INITIAL
+
+                    # Update Prometheus metrics
+                    co2_gauge.set(co2_value)
                 
-                # Increment alert counter if necessary
-                if level in ['WARNING', 'ALERT']:
-                    co2_alerts.labels(severity=level).inc()
+                    # Move the level flag only when the classification changes
+                    if level != prev_level:
+                        if prev_level is not None:
+                            LEVEL_GAUGES[prev_level].set(0)
+                        LEVEL_GAUGES[level].set(1)
+                        prev_level = level
+
+                        # Count an alert when a reading enters an alert level, so the
+                        # counter doesn't depend on the (adaptive) polling rate
+                        if level in ['WARNING', 'ALERT']:
+                            co2_alerts.labels(severity=level).inc()
+
+                    # Adjust polling rate to how fast the reading is moving
+                    current_interval = next_poll_interval(current_interval, co2_value, last_ppm, level)
+                    last_ppm = co2_value
                 
-                # Publish to MQTT topics
-                try:
-                    # Topic 1: detected status
-                    detected_topic = f"{MQTT_TOPIC_PREFIX}/detected"
                     detected_status = "NORMAL" if co2_value <= 1000 else "ABNORMAL"
-                    result1 = client.publish(
-                        detected_topic,
-                        payload=detected_status,
-                        qos=1,
-                        retain=False
-                    )
-                    if result1.rc != mqtt.MQTT_ERR_SUCCESS:
-                        logger.error(f"Failed to publish to detected topic. Error code: {result1.rc}")
-                    else:
-                        result1.wait_for_publish()
-                        logger.info(f"Published to {detected_topic}: {detected_status}")
-
-                    # Topic 2: PPM level
-                    level_topic = f"{MQTT_TOPIC_PREFIX}/level"
-                    result2 = client.publish(
-                        level_topic,
-                        payload=str(co2_value),
-                        qos=1,
-                        retain=False
-                    )
-                    if result2.rc != mqtt.MQTT_ERR_SUCCESS:
-                        logger.error(f"Failed to publish to level topic. Error code: {result2.rc}")
-                    else:
-                        result2.wait_for_publish()
-                        logger.info(f"Published to {level_topic}: {co2_value}")
-
-                    # Topic 3: Peak PPM (only publish when new peak is reached)
                     if co2_value > peak_ppm:
                         peak_ppm = co2_value
-                        peak_topic = f"{MQTT_TOPIC_PREFIX}/peak"
-                        result3 = client.publish(
-                            peak_topic,
-                            payload=str(peak_ppm),
-                            qos=1,
-                            retain=True  # Retain the peak value
-                        )
-                        if result3.rc != mqtt.MQTT_ERR_SUCCESS:
-                            logger.error(f"Failed to publish to peak topic. Error code: {result3.rc}")
-                        else:
-                            result3.wait_for_publish()
-                            logger.info(f"New peak value published to {peak_topic}: {peak_ppm}")
-
-                    # Topic 4: Online status - publish 1 for valid reading
-                    online_topic = f"{MQTT_TOPIC_PREFIX}/online"
-                    result4 = client.publish(
-                        online_topic,
-                        payload="1",
-                        qos=1,
-                        retain=True
+
+                    # Skip the state message while the reading is unchanged, except on heartbeats
+                    is_heartbeat = heartbeat % STATE_HEARTBEAT_CYCLES == 0
+                    heartbeat += 1
+                    status_changed = (
+                        is_heartbeat
+                        or peak_ppm != peak_published
+                        or detected_status != last_published["detected"]
+                        or level != last_published["level_class"]
+                    )
+                    state_changed = (
+                        status_changed
+                        or last_published["level"] is None
+                        or abs(co2_value - last_published["level"]) >= STATE_PPM_DELTA
                     )
-                    if result4.rc != mqtt.MQTT_ERR_SUCCESS:
-                        logger.error(f"Failed to publish online status. Error code: {result4.rc}")
+
+                    # Publish to MQTT topics; while disconnected paho's reconnect loop takes over
+                    if mqtt_connected:
+                        try:
+                            # Topic 1: combined state, only when it changed or on a heartbeat.
+                            # A plain ppm update is telemetry and goes out at QoS 0; status
+                            # changes and heartbeats use QoS 1 so they are acknowledged
+                            if state_changed:
+                                state_payload = json.dumps({
+                                    "ppm": co2_value,
+                                    "level": level,
+                                    "detected": detected_status,
+                                    "peak": peak_ppm
+                                })
+                                result1 = client.publish(
+                                    STATE_TOPIC,
+                                    payload=state_payload,
+                                    qos=1 if status_changed else 0,
+                                    retain=True
+                                )
+                                last_published = {"detected": detected_status, "level": co2_value, "level_class": level}
+                                logger.info(f"Queued message {result1.mid} to {STATE_TOPIC}: {state_payload}")
+                            else:
+                                logger.debug("State unchanged, skipping publish")
+
+                            # Topic 2: Peak PPM (only publish when the peak hasn't been sent yet)
+                            if peak_ppm != peak_published:
+                                result2 = client.publish(
+                                    PEAK_TOPIC,
+                                    payload=str(peak_ppm),
+                                    qos=1,
+                                    retain=True  # Retain the peak value
+                                )
+                                peak_published = peak_ppm
+                                logger.info(f"Queued message {result2.mid} with new peak value to {PEAK_TOPIC}: {peak_ppm}")
+
+                            # Topic 3: Online status - publish 1 when coming back online and on heartbeats
+                            if online_status != ONLINE_1 or is_heartbeat:
+                                result3 = client.publish(
+                                    ONLINE_TOPIC,
+                                    payload=ONLINE_1,
+                                    qos=1,
+                                    retain=True
+                                )
+                                online_status = ONLINE_1
+                                logger.debug("Queued message %d with online status: 1", result3.mid)
+
+                        except Exception as e:
+                            logger.error(f"Exception while publishing to MQTT: {e}")
                     else:
-                        result4.wait_for_publish()
-                        logger.debug("Published online status: 1")
+                        logger.warning("MQTT broker not connected, skipping publish")
 
-                except Exception as e:
-                    logger.error(f"Exception while publishing to MQTT: {e}")
+                    sleep_for = current_interval
                 
-            else:
-                # Publish offline status when no valid reading
-                online_topic = f"{MQTT_TOPIC_PREFIX}/online"
-                try:
-                    result = client.publish(
-                        online_topic,
-                        payload="0",
-                        qos=1,
-                        retain=True
-                    )
-                    if result.rc != mqtt.MQTT_ERR_SUCCESS:
-                        logger.error(f"Failed to publish offline status. Error code: {result.rc}")
-                    else:
-                        result.wait_for_publish()
-                        logger.debug("Published online status: 0")
-                except Exception as e:
-                    logger.error(f"Exception while publishing offline status: {e}")
+                else:
+                    # Publish offline status when no valid reading
+                    if mqtt_connected and online_status != ONLINE_0:
+                        try:
+                            result = client.publish(
+                                ONLINE_TOPIC,
+                                payload=ONLINE_0,
+                                qos=1,
+                                retain=True
+                            )
+                            online_status = ONLINE_0
+                            logger.debug("Queued message %d with online status: 0", result.mid)
+                        except Exception as e:
+                            logger.error(f"Exception while publishing offline status: {e}")
+
+                    # Back off while the sensor keeps failing
+                    sleep_for = jittered(error_backoff)
+                    error_backoff = min(error_backoff * 2, ERROR_BACKOFF_MAX)
 
-            time.sleep(10)  # Wait 10 seconds before next reading
+                # If we've fallen behind (e.g. a slow publish), restart the schedule from now
+                now = time.monotonic()
+                next_tick = max(next_tick + sleep_for, now)
+                logger.debug("Next reading in %.1f seconds", next_tick - now)
+                time.sleep(next_tick - now)
             
-        except Exception as e:
-            logger.error(f"Error in main loop: {e}")
-            # Publish offline status on error
-            try:
-                client.publish(f"{MQTT_TOPIC_PREFIX}/online", "0", qos=1, retain=True)
-            except Exception as publish_error:
-                logger.error(f"Failed to publish offline status after error: {publish_error}")
-            time.sleep(10)  # Wait before retrying
+            except Exception as e:
+                logger.error(f"Error in main loop: {e}")
+                # Errors such as termios.error from a hung-up tty aren't SerialExceptions,
+                # so drop the port here and let the next cycle reopen it
+                if sensor is not None:
+                    try:
+                        sensor.close()
+                    except Exception as close_error:
+                        logger.debug("Failed to close serial port: %s", close_error)
+                    sensor = None
+                # Publish offline status on error
+                try:
+                    client.publish(ONLINE_TOPIC, ONLINE_0, qos=1, retain=True)
+                    online_status = ONLINE_0
+                except Exception as publish_error:
+                    logger.error(f"Failed to publish offline status after error: {publish_error}")
+                retry_delay = jittered(error_backoff)
+                next_tick = time.monotonic() + retry_delay
+                time.sleep(retry_delay)  # Wait before retrying
+                error_backoff = min(error_backoff * 2, ERROR_BACKOFF_MAX)
+    finally:
+        if sensor is not None and sensor.is_open:
+            sensor.close()
+            logger.debug("Serial port closed")
 
 if __name__ == "__main__":
     try:
         logger.info("Starting S8 CO2 sensor application")
         logger.info("CO2 Level Classifications:")
         for level, (min_val, max_val, desc) in CO2_LEVELS.items():
-            logger.info(f"  {level}: {min_val}-{max_val} ppm - {desc}")
+            ppm_range = f"{min_val}-{max_val}" if max_val is not None else f"{min_val}+"
+            logger.info(f"  {level}: {ppm_range} ppm - {desc}")
         main()
     except KeyboardInterrupt:
         logger.info("Application stopped by user")